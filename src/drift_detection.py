@@ -2,16 +2,56 @@
 Modulo per la rilevazione del drift nel modello di sentiment analysis.
 """
 import json
+import logging
 from pathlib import Path
 from typing import Dict, Tuple, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from scipy.stats import wasserstein_distance
 import numpy as np
-import numpy as np
-from .monitoring import PredictionLog
+from .monitoring import (
+    JsonlTailReader, PredictionLog, SENTIMENT_KEYS, dumps_jsonl
+)
 from .metrics import MetricsTracker, SentimentMetrics
 
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _distribution_vector(dist: Dict[str, float]) -> np.ndarray:
+    """Impacchetta una distribuzione nel vettore ordinato su SENTIMENT_KEYS.
+
+    Etichette sconosciute vengono ignorate (con warning): la distanza
+    restituita resta comunque valida sulle classi note.
+    """
+    unknown: list[str] = [k for k in dist if k not in SENTIMENT_KEYS]
+    if unknown:
+        logger.warning(f"Etichette di sentiment sconosciute ignorate: {unknown}")
+    return np.fromiter(
+        (dist.get(k, 0.0) for k in SENTIMENT_KEYS),
+        dtype=np.float64, count=len(SENTIMENT_KEYS)
+    )
+
+
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _wasserstein_1d(values1: np.ndarray, values2: np.ndarray) -> float:
+        """Kernel fuso cumsum+abs+sum, senza array temporanei."""
+        distance: float = 0.0
+        cum1: float = 0.0
+        cum2: float = 0.0
+        for i in range(values1.shape[0]):
+            cum1 += values1[i]
+            cum2 += values2[i]
+            distance += abs(cum1 - cum2)
+        return distance
+
+except ImportError:  # numba è opzionale, fallback NumPy puro
+
+    def _wasserstein_1d(values1: np.ndarray, values2: np.ndarray) -> float:
+        """Forma chiusa della Wasserstein 1-D su supporto equi-spaziato."""
+        return float(np.abs(np.cumsum(values1) - np.cumsum(values2)).sum())
+
 
 @dataclass
 class DriftReport:
@@ -29,6 +69,23 @@ class DriftReport:
         """Converte il report in dizionario."""
         return asdict(self)
 
+    def to_dict_fast(self) -> Dict[str, Any]:
+        """Come to_dict ma senza la copia ricorsiva di asdict.
+
+        I dizionari annidati sono condivisi, non copiati: da usare solo
+        quando il risultato non viene mutato (es. serializzazione).
+        """
+        return {
+            "timestamp": self.timestamp,
+            "drift_detected": self.drift_detected,
+            "drift_score": self.drift_score,
+            "drift_threshold": self.drift_threshold,
+            "baseline_distribution": self.baseline_distribution,
+            "current_distribution": self.current_distribution,
+            "average_confidence_change": self.average_confidence_change,
+            "recommendations": self.recommendations
+        }
+
 
 class DriftDetector:
     """Rilevatore di drift per il modello di sentiment analysis."""
@@ -52,8 +109,13 @@ class DriftDetector:
         
         self.drift_threshold: float = drift_threshold
         self.metrics_tracker: MetricsTracker = MetricsTracker(metrics_dir)
-        
+
         self.drift_report_file: Path = Path(metrics_dir) / "drift_reports.jsonl"
+        self._history_reader: JsonlTailReader = JsonlTailReader(self.drift_report_file)
+
+        # Cache del baseline (mtime, dati, distribuzione come vettore),
+        # invalidata automaticamente se il file viene modificato
+        self._baseline_cache: Optional[Tuple[float, Dict[str, Any], np.ndarray]] = None
     
     def set_baseline(self, logs: list[PredictionLog]) -> None:
         """
@@ -89,9 +151,18 @@ class DriftDetector:
         """
         if not self.baseline_file.exists():
             return None
-        
+
+        mtime: float = self.baseline_file.stat().st_mtime
+        if self._baseline_cache is not None and self._baseline_cache[0] == mtime:
+            return self._baseline_cache[1]
+
         with open(self.baseline_file, 'r') as f:
-            return json.load(f)
+            data: Dict[str, Any] = json.load(f)
+
+        # Pre-calcola la distribuzione come vettore ordinato per il kernel
+        vector: np.ndarray = _distribution_vector(data.get("distribution", {}))
+        self._baseline_cache = (mtime, data, vector)
+        return data
     
     def _calculate_wasserstein_distance(
         self,
@@ -108,25 +179,29 @@ class DriftDetector:
         Returns:
             Distanza di Wasserstein normalizzata (0-1)
         """
-        # Assicura che entrambe le distribuzioni abbiano le stesse chiavi
-        all_keys: set[str] = set(dist1.keys()) | set(dist2.keys())
-        
-        values1: list[float] = [dist1.get(k, 0.0) for k in sorted(all_keys)]
-        values2: list[float] = [dist2.get(k, 0.0) for k in sorted(all_keys)]
-        
-        # Calcola la distanza di Wasserstein
-        distance: float = wasserstein_distance(values1, values2)
-        
+        # Per categorie equi-spaziate con distribuzioni a somma 1 la EMD 1-D
+        # si riduce alla forma chiusa sum(|cumsum(u) - cumsum(v)|)
+        values1: np.ndarray = _distribution_vector(dist1)
+        values2: np.ndarray = _distribution_vector(dist2)
+
+        distance: float = float(_wasserstein_1d(values1, values2))
+
         # Normalizza a 0-1
         return min(distance, 1.0)
     
-    def detect_drift(self, logs: list[PredictionLog]) -> DriftReport:
+    def detect_drift(
+        self,
+        logs: list[PredictionLog],
+        current_metrics: Optional[SentimentMetrics] = None
+    ) -> DriftReport:
         """
         Rileva il drift confrontando le metriche attuali con il baseline.
-        
+
         Args:
             logs: Lista di PredictionLog recenti
-            
+            current_metrics: Metriche già calcolate sugli stessi log, se
+                disponibili; evita un secondo passaggio su tutti i log
+
         Returns:
             DriftReport con i risultati della rilevazione
         """
@@ -147,17 +222,23 @@ class DriftDetector:
                 recommendations=["Baseline non trovato, creato con i dati attuali"]
             )
         
-        # Calcola le metriche attuali
-        current_metrics: SentimentMetrics = self.metrics_tracker.calculate_metrics(logs)
+        # Calcola le metriche attuali (se non già fornite dal chiamante)
+        if current_metrics is None:
+            current_metrics = self.metrics_tracker.calculate_metrics(logs)
         current_dist: Dict[str, float] = {
             sentiment: (pct / 100.0)
             for sentiment, pct in current_metrics.sentiment_percentages.items()
         }
         
         baseline_dist: Dict[str, float] = baseline["distribution"]
-        
-        # Calcola il drift score usando la distanza di Wasserstein
-        drift_score: float = self._calculate_wasserstein_distance(baseline_dist, current_dist)
+
+        # Calcola il drift score usando la distanza di Wasserstein; il vettore
+        # baseline arriva già pronto dalla cache
+        baseline_vector: np.ndarray = self._baseline_cache[2]
+        current_vector: np.ndarray = _distribution_vector(current_dist)
+        drift_score: float = min(
+            float(_wasserstein_1d(baseline_vector, current_vector)), 1.0
+        )
         
         # Calcola il cambio nella confidenza media
         baseline_confidence: float = baseline.get("average_confidence", 0.5)
@@ -223,30 +304,26 @@ class DriftDetector:
                 return o.isoformat()
             return o
 
-        serializable = _to_serializable(report.to_dict())
-        with open(self.drift_report_file, 'a') as f:
-            f.write(json.dumps(serializable) + '\n')
+        serializable = _to_serializable(report.to_dict_fast())
+        with open(self.drift_report_file, 'ab') as f:
+            f.write(dumps_jsonl(serializable))
     
-    def get_drift_history(self) -> list[DriftReport]:
+    def get_drift_history(self, as_records: bool = False) -> list:
         """
         Ritorna la storia dei report di drift.
-        
+
+        Args:
+            as_records: Se True ritorna i dizionari grezzi senza costruire
+                i dataclass (più veloce per letture parziali)
+
         Returns:
-            Lista di DriftReport
+            Lista di DriftReport (o di dizionari se as_records=True);
+            al più gli ultimi 10000 record
         """
-        reports: list[DriftReport] = []
-        
-        if not self.drift_report_file.exists():
-            return reports
-        
-        with open(self.drift_report_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    data: Dict[str, Any] = json.loads(line)
-                    report: DriftReport = DriftReport(**data)
-                    reports.append(report)
-        
-        return reports
+        records: list[Dict[str, Any]] = self._history_reader.read()
+        if as_records:
+            return records
+        return [DriftReport(**data) for data in records]
     
     def clear_drift_reports(self) -> None:
         """Cancella tutti i report di drift."""
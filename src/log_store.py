@@ -0,0 +1,237 @@
+"""
+Modulo per la persistenza colonnare (SoA) dei log di predizione.
+
+A differenza del JSONL riga-per-riga di PredictionLogger, LogStore salva i
+campi numerici in file binari separati (una colonna per file), così le
+letture per il calcolo delle metriche diventano array NumPy senza alcun
+json.loads né allocazione di dataclass.
+"""
+import atexit
+from pathlib import Path
+from datetime import datetime
+from typing import BinaryIO, Optional, TextIO, Tuple
+import numpy as np
+from .monitoring import PredictionLog, SENTIMENT_KEYS
+
+# Indice intero per ogni classe di sentiment (colonna i8)
+_SENTIMENT_INDEX: dict[str, int] = {k: i for i, k in enumerate(SENTIMENT_KEYS)}
+
+# Sentinella (non negativa) per etichette fuori da SENTIMENT_KEYS: np.bincount
+# rifiuta valori negativi, e gli indici oltre l'ultima classe vengono
+# semplicemente ignorati da calculate_metrics_soa
+UNKNOWN_SENTIMENT: int = len(SENTIMENT_KEYS)
+
+# Record compatto di una predizione: 13 byte contro le centinaia del JSONL
+LOG_RECORD_DTYPE: np.dtype = np.dtype(
+    [('ts', 'datetime64[us]'), ('sent', 'u1'), ('conf', 'f4')]
+)
+
+
+class LogStore:
+    """Store colonnare delle predizioni: confidence, sentiment e timestamp."""
+
+    def __init__(self, store_dir: str = "logs", prefix: str = "predictions") -> None:
+        """
+        Inizializza lo store.
+
+        Args:
+            store_dir: Directory dove salvare le colonne
+            prefix: Prefisso dei file colonna
+        """
+        self.store_dir: Path = Path(store_dir)
+        self.store_dir.mkdir(exist_ok=True)
+
+        self.confidence_file: Path = self.store_dir / f"{prefix}_confidence.f64"
+        self.sentiment_file: Path = self.store_dir / f"{prefix}_sentiment.i8"
+        self.timestamp_file: Path = self.store_dir / f"{prefix}_timestamp.i64"
+        self.text_file: Path = self.store_dir / f"{prefix}_text.txt"
+
+        self._conf_fh: Optional[BinaryIO] = None
+        self._sent_fh: Optional[BinaryIO] = None
+        self._ts_fh: Optional[BinaryIO] = None
+        self._text_fh: Optional[TextIO] = None
+        atexit.register(self.close)
+
+    def append(self, log: PredictionLog) -> None:
+        """
+        Aggiunge una predizione allo store (utilizzabile come callback
+        on_log di PredictionLogger).
+
+        Args:
+            log: PredictionLog da salvare
+        """
+        self._open_handles()
+
+        self._conf_fh.write(np.float64(log.confidence).tobytes())
+        self._sent_fh.write(
+            np.int8(_SENTIMENT_INDEX.get(log.sentiment, UNKNOWN_SENTIMENT)).tobytes()
+        )
+        timestamp: int = int(datetime.fromisoformat(log.timestamp).timestamp())
+        self._ts_fh.write(np.int64(timestamp).tobytes())
+        self._text_fh.write(log.text.replace('\n', ' ') + '\n')
+
+        for fh in (self._conf_fh, self._sent_fh, self._ts_fh, self._text_fh):
+            fh.flush()
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Carica le colonne numeriche dello store.
+
+        Returns:
+            Tupla (confidence float64, sentiment int8, timestamp int64)
+        """
+        if not self.confidence_file.exists():
+            return (
+                np.empty(0, dtype=np.float64),
+                np.empty(0, dtype=np.int8),
+                np.empty(0, dtype=np.int64)
+            )
+
+        confidences: np.ndarray = np.fromfile(self.confidence_file, dtype=np.float64)
+        sentiments: np.ndarray = np.fromfile(self.sentiment_file, dtype=np.int8)
+        timestamps: np.ndarray = np.fromfile(self.timestamp_file, dtype=np.int64)
+        return confidences, sentiments, timestamps
+
+    def count(self) -> int:
+        """
+        Ritorna il numero di predizioni nello store.
+
+        Returns:
+            Numero di record
+        """
+        if not self.confidence_file.exists():
+            return 0
+        return self.confidence_file.stat().st_size // 8
+
+    def close(self) -> None:
+        """Chiude gli handle di scrittura dello store."""
+        for fh in (self._conf_fh, self._sent_fh, self._ts_fh, self._text_fh):
+            if fh is not None:
+                fh.close()
+        self._conf_fh = self._sent_fh = self._ts_fh = self._text_fh = None
+
+    def clear(self) -> None:
+        """Cancella tutte le colonne dello store."""
+        self.close()
+        for path in (
+            self.confidence_file, self.sentiment_file,
+            self.timestamp_file, self.text_file
+        ):
+            if path.exists():
+                path.unlink()
+
+    def _open_handles(self) -> None:
+        """Apre gli handle di append alla prima scrittura."""
+        if self._conf_fh is None:
+            self._conf_fh = open(self.confidence_file, 'ab')
+            self._sent_fh = open(self.sentiment_file, 'ab')
+            self._ts_fh = open(self.timestamp_file, 'ab')
+            self._text_fh = open(self.text_file, 'a')
+
+
+class BinaryLogSink:
+    """
+    Sink binario bufferizzato per le predizioni.
+
+    Accumula i record in memoria e li scrive a blocchi come array
+    strutturato LOG_RECORD_DTYPE; i lettori analitici riaprono il file
+    con np.memmap e ottengono le colonne (ts, sent, conf) in zero-copy,
+    ad es. da passare a MetricsTracker.calculate_metrics_soa.
+    """
+
+    def __init__(
+        self,
+        store_dir: str = "logs",
+        sink_file: str = "predictions.rec",
+        batch_size: int = 256
+    ) -> None:
+        """
+        Inizializza il sink.
+
+        Args:
+            store_dir: Directory dove salvare il file binario
+            sink_file: Nome del file dei record
+            batch_size: Numero di record accumulati prima del flush
+        """
+        self.store_dir: Path = Path(store_dir)
+        self.store_dir.mkdir(exist_ok=True)
+
+        self.sink_file: Path = self.store_dir / sink_file
+        self.batch_size: int = batch_size
+
+        self._buffer: list = []
+        self._fh: Optional[BinaryIO] = None
+        atexit.register(self.close)
+
+    def append(self, log: PredictionLog) -> None:
+        """
+        Accoda una predizione al buffer (utilizzabile come callback
+        on_log di PredictionLogger); scrive su disco ogni batch_size record.
+
+        Args:
+            log: PredictionLog da salvare
+        """
+        self._buffer.append((
+            np.datetime64(log.timestamp),
+            _SENTIMENT_INDEX.get(log.sentiment, UNKNOWN_SENTIMENT),
+            log.confidence
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Scrive il buffer corrente su disco come array strutturato."""
+        if not self._buffer:
+            return
+        if self._fh is None:
+            self._fh = open(self.sink_file, 'ab')
+
+        batch: np.ndarray = np.array(self._buffer, dtype=LOG_RECORD_DTYPE)
+        self._fh.write(batch.tobytes())
+        self._fh.flush()
+        self._buffer.clear()
+
+    def load(self, mmap: bool = True) -> np.ndarray:
+        """
+        Carica i record scritti su disco (il buffer non ancora flushato
+        non è incluso).
+
+        Args:
+            mmap: Se True apre il file con np.memmap (zero-copy)
+
+        Returns:
+            Array strutturato con campi ts, sent, conf
+        """
+        if not self.sink_file.exists() or self.sink_file.stat().st_size == 0:
+            return np.empty(0, dtype=LOG_RECORD_DTYPE)
+
+        if mmap:
+            return np.memmap(self.sink_file, dtype=LOG_RECORD_DTYPE, mode='r')
+        return np.fromfile(self.sink_file, dtype=LOG_RECORD_DTYPE)
+
+    def count(self) -> int:
+        """
+        Ritorna il numero di record scritti su disco.
+
+        Returns:
+            Numero di record
+        """
+        if not self.sink_file.exists():
+            return 0
+        return self.sink_file.stat().st_size // LOG_RECORD_DTYPE.itemsize
+
+    def close(self) -> None:
+        """Flusha il buffer e chiude l'handle del sink."""
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def clear(self) -> None:
+        """Cancella il buffer e il file dei record."""
+        self._buffer.clear()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if self.sink_file.exists():
+            self.sink_file.unlink()
@@ -1,13 +1,15 @@
 """
 Modulo per il tracking e calcolo delle metriche di monitoraggio.
 """
-import json
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
-from collections import Counter
-from .monitoring import PredictionLog
+from datetime import datetime
+from collections import Counter, defaultdict
+import numpy as np
+from .monitoring import (
+    JsonlTailReader, PredictionLog, SENTIMENT_KEYS, dumps_jsonl
+)
 
 
 @dataclass
@@ -24,6 +26,21 @@ class SentimentMetrics:
         """Converte le metriche in dizionario."""
         return asdict(self)
 
+    def to_dict_fast(self) -> Dict[str, Any]:
+        """Come to_dict ma senza la copia ricorsiva di asdict.
+
+        I dizionari annidati sono condivisi, non copiati: da usare solo
+        quando il risultato non viene mutato (es. serializzazione).
+        """
+        return {
+            "timestamp": self.timestamp,
+            "total_predictions": self.total_predictions,
+            "sentiment_distribution": self.sentiment_distribution,
+            "sentiment_percentages": self.sentiment_percentages,
+            "average_confidence": self.average_confidence,
+            "confidence_by_sentiment": self.confidence_by_sentiment
+        }
+
 
 class MetricsTracker:
     """Tracker per il calcolo e monitoraggio delle metriche."""
@@ -40,7 +57,52 @@ class MetricsTracker:
         self.metrics_dir.mkdir(exist_ok=True)
         
         self.metrics_file: Path = self.metrics_dir / metrics_file
-    
+        self._history_reader: JsonlTailReader = JsonlTailReader(self.metrics_file)
+
+        # Stato incrementale: aggiornato via update() ad ogni predizione,
+        # letto in O(1) da snapshot()
+        self._counts: Counter = Counter()
+        self._sum_conf: float = 0.0
+        self._sum_conf_per: defaultdict = defaultdict(float)
+
+    def update(self, log: PredictionLog) -> None:
+        """
+        Aggiorna lo stato incrementale con una nuova predizione.
+
+        Args:
+            log: PredictionLog appena registrato
+        """
+        self._counts[log.sentiment] += 1
+        self._sum_conf += log.confidence
+        self._sum_conf_per[log.sentiment] += log.confidence
+
+    def snapshot(self) -> SentimentMetrics:
+        """
+        Calcola le metriche dallo stato incrementale, senza ripassare i log.
+
+        Returns:
+            SentimentMetrics con le metriche correnti
+        """
+        total: int = sum(self._counts.values())
+
+        if total == 0:
+            return self.calculate_metrics([])
+
+        return SentimentMetrics(
+            timestamp=datetime.now().isoformat(),
+            total_predictions=total,
+            sentiment_distribution=dict(self._counts),
+            sentiment_percentages={
+                sentiment: (count / total * 100)
+                for sentiment, count in self._counts.items()
+            },
+            average_confidence=self._sum_conf / total,
+            confidence_by_sentiment={
+                sentiment: self._sum_conf_per[sentiment] / count
+                for sentiment, count in self._counts.items()
+            }
+        )
+
     def calculate_metrics(self, logs: list[PredictionLog]) -> SentimentMetrics:
         """
         Calcola le metriche dai log delle predizioni.
@@ -61,28 +123,39 @@ class MetricsTracker:
                 confidence_by_sentiment={}
             )
         
-        # Distribuzione dei sentiment
-        sentiments: list[str] = [log.sentiment for log in logs]
-        sentiment_distribution: Dict[str, int] = dict(Counter(sentiments))
-        
         total: int = len(logs)
+
+        # Estrae i campi in array NumPy (un solo passaggio sui log)
+        sentiments: np.ndarray = np.array([log.sentiment for log in logs])
+        confidences: np.ndarray = np.fromiter(
+            (log.confidence for log in logs), dtype=np.float64, count=total
+        )
+
+        # Distribuzione e somme di confidenza per classe in forma vettoriale
+        unique: np.ndarray
+        inverse: np.ndarray
+        counts: np.ndarray
+        unique, inverse, counts = np.unique(
+            sentiments, return_inverse=True, return_counts=True
+        )
+        conf_sums: np.ndarray = np.bincount(inverse, weights=confidences)
+        labels: list[str] = unique.tolist()
+
+        sentiment_distribution: Dict[str, int] = {
+            sentiment: int(count) for sentiment, count in zip(labels, counts)
+        }
         sentiment_percentages: Dict[str, float] = {
-            sentiment: (count / total * 100)
-            for sentiment, count in sentiment_distribution.items()
+            sentiment: (int(count) / total * 100)
+            for sentiment, count in zip(labels, counts)
         }
-        
-        # Confidenza media
-        average_confidence: float = sum(log.confidence for log in logs) / total
-        
-        # Confidenza media per sentiment
-        confidence_by_sentiment: Dict[str, float] = {}
-        for sentiment in sentiment_distribution.keys():
-            sentiment_logs: list[PredictionLog] = [
-                log for log in logs if log.sentiment == sentiment
-            ]
-            avg_conf: float = sum(log.confidence for log in sentiment_logs) / len(sentiment_logs)
-            confidence_by_sentiment[sentiment] = avg_conf
-        
+
+        # Confidenza media globale e per sentiment
+        average_confidence: float = float(confidences.mean())
+        confidence_by_sentiment: Dict[str, float] = {
+            sentiment: float(conf_sum / count)
+            for sentiment, conf_sum, count in zip(labels, conf_sums, counts)
+        }
+
         metrics: SentimentMetrics = SentimentMetrics(
             timestamp=datetime.now().isoformat(),
             total_predictions=total,
@@ -94,6 +167,53 @@ class MetricsTracker:
         
         return metrics
     
+    def calculate_metrics_soa(
+        self,
+        confidences: np.ndarray,
+        sentiments: np.ndarray
+    ) -> SentimentMetrics:
+        """
+        Calcola le metriche dalle colonne SoA di un LogStore.
+
+        Args:
+            confidences: Array float64 delle confidenze
+            sentiments: Array intero degli indici di sentiment
+                (ordine di SENTIMENT_KEYS)
+
+        Returns:
+            SentimentMetrics con le metriche calcolate
+        """
+        total: int = int(sentiments.shape[0])
+
+        if total == 0:
+            return self.calculate_metrics([])
+
+        counts: np.ndarray = np.bincount(
+            sentiments, minlength=len(SENTIMENT_KEYS)
+        )
+        conf_sums: np.ndarray = np.bincount(
+            sentiments, weights=confidences, minlength=len(SENTIMENT_KEYS)
+        )
+
+        return SentimentMetrics(
+            timestamp=datetime.now().isoformat(),
+            total_predictions=total,
+            sentiment_distribution={
+                sentiment: int(count)
+                for sentiment, count in zip(SENTIMENT_KEYS, counts) if count
+            },
+            sentiment_percentages={
+                sentiment: (int(count) / total * 100)
+                for sentiment, count in zip(SENTIMENT_KEYS, counts) if count
+            },
+            average_confidence=float(confidences.mean()),
+            confidence_by_sentiment={
+                sentiment: float(conf_sum / count)
+                for sentiment, conf_sum, count in zip(SENTIMENT_KEYS, conf_sums, counts)
+                if count
+            }
+        )
+
     def save_metrics(self, metrics: SentimentMetrics) -> None:
         """
         Salva le metriche nel file.
@@ -101,29 +221,25 @@ class MetricsTracker:
         Args:
             metrics: SentimentMetrics da salvare
         """
-        with open(self.metrics_file, 'a') as f:
-            f.write(json.dumps(metrics.to_dict()) + '\n')
+        with open(self.metrics_file, 'ab') as f:
+            f.write(dumps_jsonl(metrics.to_dict_fast()))
     
-    def get_metrics_history(self) -> list[SentimentMetrics]:
+    def get_metrics_history(self, as_records: bool = False) -> list:
         """
         Ritorna la storia delle metriche.
-        
+
+        Args:
+            as_records: Se True ritorna i dizionari grezzi senza costruire
+                i dataclass (più veloce per letture parziali)
+
         Returns:
-            Lista di SentimentMetrics
+            Lista di SentimentMetrics (o di dizionari se as_records=True);
+            al più gli ultimi 10000 record
         """
-        metrics_history: list[SentimentMetrics] = []
-        
-        if not self.metrics_file.exists():
-            return metrics_history
-        
-        with open(self.metrics_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    data: Dict[str, Any] = json.loads(line)
-                    metrics: SentimentMetrics = SentimentMetrics(**data)
-                    metrics_history.append(metrics)
-        
-        return metrics_history
+        records: list[Dict[str, Any]] = self._history_reader.read()
+        if as_records:
+            return records
+        return [SentimentMetrics(**data) for data in records]
     
     def get_metrics_over_time(
         self,
@@ -142,40 +258,32 @@ class MetricsTracker:
         """
         if not logs:
             return []
-        
-        # Ordina i log per timestamp
-        sorted_logs: list[PredictionLog] = sorted(
-            logs, key=lambda x: x.timestamp
+
+        # Parsa tutti i timestamp ISO in un'unica chiamata NumPy
+        stamps: np.ndarray = np.array(
+            [log.timestamp for log in logs], dtype='datetime64[us]'
         )
-        
-        # Crea finestre temporali
+        epoch_us: np.ndarray = stamps.astype(np.int64)
+        order: np.ndarray = epoch_us.argsort(kind='stable')
+        epoch_us = epoch_us[order]
+        sorted_logs: list[PredictionLog] = [logs[i] for i in order]
+
+        # Assegna ogni log alla sua finestra con una divisione intera
+        window_us: int = window_hours * 3600 * 1_000_000
+        buckets: np.ndarray = (epoch_us - epoch_us[0]) // window_us
+        bucket_ids: np.ndarray
+        starts: np.ndarray
+        bucket_ids, starts = np.unique(buckets, return_index=True)
+        boundaries: list[int] = starts.tolist() + [len(sorted_logs)]
+
         metrics_over_time: list[Tuple[str, SentimentMetrics]] = []
-        current_window: list[PredictionLog] = []
-        
-        start_time: datetime = datetime.fromisoformat(sorted_logs[0].timestamp)
-        window_end: datetime = start_time + timedelta(hours=window_hours)
-        
-        for log in sorted_logs:
-            log_time: datetime = datetime.fromisoformat(log.timestamp)
-            
-            if log_time > window_end:
-                # Calcola metriche per la finestra corrente
-                if current_window:
-                    metrics: SentimentMetrics = self.calculate_metrics(current_window)
-                    metrics_over_time.append((start_time.isoformat(), metrics))
-                
-                # Sposta alla finestra successiva
-                start_time = window_end
-                window_end = start_time + timedelta(hours=window_hours)
-                current_window = []
-            
-            current_window.append(log)
-        
-        # Aggiungi l'ultima finestra
-        if current_window:
-            metrics = self.calculate_metrics(current_window)
-            metrics_over_time.append((start_time.isoformat(), metrics))
-        
+        for bucket_id, lo, hi in zip(bucket_ids, boundaries[:-1], boundaries[1:]):
+            window_start: datetime = np.datetime64(
+                int(epoch_us[0]) + int(bucket_id) * window_us, 'us'
+            ).item()
+            metrics: SentimentMetrics = self.calculate_metrics(sorted_logs[lo:hi])
+            metrics_over_time.append((window_start.isoformat(), metrics))
+
         return metrics_over_time
     
     def clear_metrics(self) -> None:
@@ -1,14 +1,94 @@
 """
 Modulo di monitoraggio per logging delle predizioni e gestione dei log.
 """
+import atexit
 import json
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Any, BinaryIO, Callable, Dict, Optional
 from dataclasses import dataclass, asdict
+from collections import deque
 import os
 
+try:
+    import orjson
+except ImportError:  # orjson è opzionale, fallback su json stdlib
+    orjson = None
+
+# Ordine canonico delle classi di sentiment, condiviso da tutto il package
+SENTIMENT_KEYS: tuple[str, ...] = ("Negativo", "Neutro", "Positivo")
+
+
+def dumps_jsonl(obj: Dict[str, Any]) -> bytes:
+    """Serializza un dizionario in una riga JSONL (bytes, newline incluso)."""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode('utf-8')
+
+
+def loads_jsonl(path: Path) -> list[Dict[str, Any]]:
+    """Parsa un file JSONL in una lista di dizionari (orjson se disponibile)."""
+    if not path.exists():
+        return []
+    loads = orjson.loads if orjson is not None else json.loads
+    return [
+        loads(line) for line in path.read_bytes().split(b'\n') if line.strip()
+    ]
+
+
+class JsonlTailReader:
+    """
+    Lettore incrementale di un file JSONL append-only.
+
+    Tiene traccia dell'offset dell'ultima lettura e ad ogni chiamata parsa
+    solo le righe nuove, mantenendo in memoria una deque limitata degli
+    ultimi record. Se il file viene troncato o cancellato la lettura
+    riparte dall'inizio.
+    """
+
+    def __init__(self, path: Path, maxlen: int = 10000) -> None:
+        """
+        Inizializza il lettore.
+
+        Args:
+            path: File JSONL da leggere
+            maxlen: Numero massimo di record tenuti in memoria
+        """
+        self.path: Path = Path(path)
+        self._offset: int = 0
+        self._records: deque = deque(maxlen=maxlen)
+
+    def read(self) -> list[Dict[str, Any]]:
+        """
+        Ritorna i record del file (al più maxlen, i più recenti).
+
+        Returns:
+            Lista di dizionari
+        """
+        if not self.path.exists():
+            self._offset = 0
+            self._records.clear()
+            return []
+
+        size: int = self.path.stat().st_size
+        if size < self._offset:
+            # File troncato o riscritto: si riparte da zero
+            self._offset = 0
+            self._records.clear()
+
+        if size > self._offset:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data: bytes = f.read()
+                self._offset = f.tell()
+            loads = orjson.loads if orjson is not None else json.loads
+            self._records.extend(
+                loads(line) for line in data.split(b'\n') if line.strip()
+            )
+
+        return list(self._records)
+
 
 @dataclass
 class PredictionLog:
@@ -23,23 +103,50 @@ class PredictionLog:
         """Converte il log in dizionario."""
         return asdict(self)
 
+    def to_dict_fast(self) -> Dict[str, Any]:
+        """Come to_dict ma senza la copia ricorsiva di asdict.
+
+        I dizionari annidati sono condivisi, non copiati: da usare solo
+        quando il risultato non viene mutato (es. serializzazione).
+        """
+        return {
+            "timestamp": self.timestamp,
+            "text": self.text,
+            "sentiment": self.sentiment,
+            "confidence": self.confidence,
+            "scores": self.scores
+        }
+
 
 class PredictionLogger:
     """Logger per le predizioni del modello di sentiment analysis."""
     
-    def __init__(self, log_dir: str = "logs", log_file: str = "predictions.jsonl") -> None:
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        log_file: str = "predictions.jsonl",
+        on_log: Optional[Callable[[PredictionLog], None]] = None
+    ) -> None:
         """
         Inizializza il logger.
-        
+
         Args:
             log_dir: Directory dove salvare i log
             log_file: Nome del file di log
+            on_log: Callback opzionale invocata dopo ogni predizione loggata
+                (es. MetricsTracker.update per le metriche incrementali)
         """
+        self.on_log: Optional[Callable[[PredictionLog], None]] = on_log
+
         self.log_dir: Path = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
         
         self.log_file: Path = self.log_dir / log_file
-        
+
+        # Handle persistente in append per evitare open/close ad ogni predizione
+        self._fh: Optional[BinaryIO] = None
+        atexit.register(self.close)
+
         # Configura il logger di sistema
         self.logger: logging.Logger = logging.getLogger("sentiment_monitor")
         if not self.logger.handlers:
@@ -56,22 +163,31 @@ class PredictionLogger:
     def log_prediction(
         self,
         text: str,
-        sentiment_scores: Dict[str, float]
+        sentiment_scores: Dict[str, float],
+        sentiment: Optional[str] = None,
+        confidence: Optional[float] = None
     ) -> PredictionLog:
         """
         Logga una predizione.
-        
+
         Args:
             text: Testo analizzato
             sentiment_scores: Dictionary con i punteggi dei sentiment
-            
+            sentiment: Sentiment principale, se già calcolato a monte
+                (es. dall'argmax del modello); altrimenti viene derivato
+                dai punteggi
+            confidence: Confidenza del sentiment principale, se già nota
+
         Returns:
             PredictionLog con i dettagli della predizione
         """
-        # Determina il sentiment principale e la confidenza
-        sentiment: str = max(sentiment_scores, key=sentiment_scores.get)
-        confidence: float = sentiment_scores[sentiment]
-        
+        # Determina il sentiment principale e la confidenza, se non
+        # già forniti dal chiamante
+        if sentiment is None:
+            sentiment = max(sentiment_scores, key=sentiment_scores.__getitem__)
+        if confidence is None:
+            confidence = sentiment_scores[sentiment]
+
         # Crea il log
         log_entry: PredictionLog = PredictionLog(
             timestamp=datetime.now().isoformat(),
@@ -81,17 +197,34 @@ class PredictionLogger:
             scores=sentiment_scores
         )
         
-        # Salva nel file JSONL
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry.to_dict()) + '\n')
-        
+        # Salva nel file JSONL tramite l'handle persistente; il flush per riga
+        # mantiene il file leggibile subito dopo la scrittura
+        fh: BinaryIO = self._file_handle()
+        fh.write(dumps_jsonl(log_entry.to_dict_fast()))
+        fh.flush()
+
         self.logger.info(
             f"Predizione loggata: sentiment={sentiment}, "
             f"confidence={confidence:.4f}"
         )
-        
+
+        if self.on_log is not None:
+            self.on_log(log_entry)
+
         return log_entry
-    
+
+    def _file_handle(self) -> BinaryIO:
+        """Ritorna l'handle di scrittura, aprendolo alla prima predizione."""
+        if self._fh is None:
+            self._fh = open(self.log_file, 'ab', buffering=1 << 16)
+        return self._fh
+
+    def close(self) -> None:
+        """Chiude l'handle di scrittura del file di log."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
     def load_logs(self) -> list[PredictionLog]:
         """
         Carica tutti i log delle predizioni.
@@ -115,6 +248,7 @@ class PredictionLogger:
     
     def clear_logs(self) -> None:
         """Cancella tutti i log delle predizioni."""
+        self.close()
         if self.log_file.exists():
             self.log_file.unlink()
         self.logger.info("Log delle predizioni cancellato")
@@ -122,8 +256,15 @@ class PredictionLogger:
     def get_logs_count(self) -> int:
         """
         Ritorna il numero di predizioni loggare.
-        
+
         Returns:
             Numero di log
         """
-        return len(self.load_logs())
+        if not self.log_file.exists():
+            return 0
+
+        # Conta i newline leggendo a blocchi, senza parsare il JSON
+        with open(self.log_file, 'rb') as f:
+            return sum(
+                chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')
+            )
@@ -1,13 +1,13 @@
 """
 Modulo per la gestione del retraining del modello.
 """
-import json
 from pathlib import Path
 from typing import Dict, Tuple, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
+from collections import Counter
 import numpy as np
-from .monitoring import PredictionLog
+from .monitoring import JsonlTailReader, PredictionLog, dumps_jsonl, loads_jsonl
 from .metrics import MetricsTracker, SentimentMetrics
 from .drift_detection import DriftDetector, DriftReport
 
@@ -27,6 +27,18 @@ class RetrainingTrigger:
         """Converte il trigger in dizionario."""
         return asdict(self)
 
+    def to_dict_fast(self) -> Dict[str, Any]:
+        """Come to_dict ma senza la copia ricorsiva di asdict (campi piatti)."""
+        return {
+            "timestamp": self.timestamp,
+            "triggered": self.triggered,
+            "reason": self.reason,
+            "confidence_threshold_met": self.confidence_threshold_met,
+            "drift_threshold_met": self.drift_threshold_met,
+            "min_samples_met": self.min_samples_met,
+            "recommended_action": self.recommended_action
+        }
+
 
 class RetrainingManager:
     """Gestore del retraining del modello."""
@@ -55,6 +67,16 @@ class RetrainingManager:
         
         self.trigger_file: Path = Path(metrics_dir) / "retraining_triggers.jsonl"
         self.trigger_file.parent.mkdir(exist_ok=True)
+        self._history_reader: JsonlTailReader = JsonlTailReader(self.trigger_file)
+
+        # Statistiche vive, aggiornate da save_trigger: la lettura diventa
+        # O(1). Ricostruite dal file con un'unica scansione all'avvio.
+        self._reason_counter: Counter = Counter()
+        self._total_evaluations: int = 0
+        self._triggered_count: int = 0
+        self._last_timestamp: Optional[str] = None
+        for record in loads_jsonl(self.trigger_file):
+            self._update_statistics(record)
     
     def evaluate_retraining_need(self, logs: list[PredictionLog]) -> RetrainingTrigger:
         """
@@ -77,8 +99,10 @@ class RetrainingManager:
         # Verifica la confidenza media
         confidence_threshold_met: bool = metrics.average_confidence < self.confidence_threshold
         
-        # Verifica il drift
-        drift_report: DriftReport = self.drift_detector.detect_drift(logs)
+        # Verifica il drift, riusando le metriche appena calcolate
+        drift_report: DriftReport = self.drift_detector.detect_drift(
+            logs, current_metrics=metrics
+        )
         drift_threshold_met: bool = drift_report.drift_detected
         
         # Determina se il retraining è necessario
@@ -148,30 +172,41 @@ class RetrainingManager:
                 return o.isoformat()
             return o
 
-        serializable = _to_serializable(trigger.to_dict())
-        with open(self.trigger_file, 'a') as f:
-            f.write(json.dumps(serializable) + '\n')
+        serializable = _to_serializable(trigger.to_dict_fast())
+        with open(self.trigger_file, 'ab') as f:
+            f.write(dumps_jsonl(serializable))
+
+        self._update_statistics(serializable)
+
+    def _update_statistics(self, record: Dict[str, Any]) -> None:
+        """
+        Aggiorna i contatori delle statistiche con un trigger.
+
+        Args:
+            record: Record di trigger (dizionario)
+        """
+        self._total_evaluations += 1
+        self._last_timestamp = record["timestamp"]
+        if record["triggered"]:
+            self._triggered_count += 1
+            self._reason_counter[record["reason"]] += 1
     
-    def get_trigger_history(self) -> list[RetrainingTrigger]:
+    def get_trigger_history(self, as_records: bool = False) -> list:
         """
         Ritorna la storia dei trigger di retraining.
-        
+
+        Args:
+            as_records: Se True ritorna i dizionari grezzi senza costruire
+                i dataclass (più veloce per letture parziali)
+
         Returns:
-            Lista di RetrainingTrigger
+            Lista di RetrainingTrigger (o di dizionari se as_records=True);
+            al più gli ultimi 10000 record
         """
-        triggers: list[RetrainingTrigger] = []
-        
-        if not self.trigger_file.exists():
-            return triggers
-        
-        with open(self.trigger_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    data: Dict[str, Any] = json.loads(line)
-                    trigger: RetrainingTrigger = RetrainingTrigger(**data)
-                    triggers.append(trigger)
-        
-        return triggers
+        records: list[Dict[str, Any]] = self._history_reader.read()
+        if as_records:
+            return records
+        return [RetrainingTrigger(**data) for data in records]
     
     def get_last_triggered(self) -> Optional[RetrainingTrigger]:
         """
@@ -189,6 +224,10 @@ class RetrainingManager:
         """Cancella tutti i trigger di retraining."""
         if self.trigger_file.exists():
             self.trigger_file.unlink()
+        self._reason_counter.clear()
+        self._total_evaluations = 0
+        self._triggered_count = 0
+        self._last_timestamp = None
     
     def get_retraining_statistics(self) -> Dict[str, Any]:
         """
@@ -197,38 +236,19 @@ class RetrainingManager:
         Returns:
             Dictionary con statistiche di retraining
         """
-        history: list[RetrainingTrigger] = self.get_trigger_history()
-        
-        if not history:
+        # Lettura O(1) dai contatori vivi, nessuna scansione del file
+        if self._total_evaluations == 0:
             return {
                 "total_evaluations": 0,
                 "triggered_count": 0,
                 "trigger_rate": 0.0,
                 "last_triggered": None
             }
-        
-        triggered_count: int = sum(1 for t in history if t.triggered)
-        
+
         return {
-            "total_evaluations": len(history),
-            "triggered_count": triggered_count,
-            "trigger_rate": triggered_count / len(history) if history else 0.0,
-            "last_triggered": history[-1].timestamp if history else None,
-            "reasons": self._get_top_reasons(history)
+            "total_evaluations": self._total_evaluations,
+            "triggered_count": self._triggered_count,
+            "trigger_rate": self._triggered_count / self._total_evaluations,
+            "last_triggered": self._last_timestamp,
+            "reasons": dict(self._reason_counter.most_common(5))
         }
-    
-    @staticmethod
-    def _get_top_reasons(triggers: list[RetrainingTrigger]) -> Dict[str, int]:
-        """
-        Estrae le ragioni più frequenti dai trigger.
-        
-        Args:
-            triggers: Lista di RetrainingTrigger
-            
-        Returns:
-            Dictionary con i conteggi delle ragioni
-        """
-        from collections import Counter
-        
-        reasons: list[str] = [t.reason for t in triggers if t.triggered]
-        return dict(Counter(reasons).most_common(5))
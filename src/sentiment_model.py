@@ -1,46 +1,187 @@
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
+import functools
+import os
+import re
 import torch
-from scipy.special import softmax
-from typing import Dict
+from typing import Dict, Tuple
+
+# Pin the intra-op thread pool (overridable via TORCH_NUM_THREADS) and keep
+# a single inter-op thread: the defaults oversubscribe multi-core hosts for
+# small batch-1 forwards. set_num_interop_threads raises if the pool has
+# already started, e.g. when another import configured torch first.
+torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", os.cpu_count() or 1)))
+try:
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    pass
 
 # Local model path
 model_path = "/workspaces/mlops-ex/twitter-roberta-base-sentiment"
 
-# Load from local folder
-tokenizer = AutoTokenizer.from_pretrained(model_path)
-model = AutoModelForSequenceClassification.from_pretrained(model_path)
+# Sentiment labels in the order of the model's output logits
+LABELS: tuple[str, ...] = ('Negativo', 'Neutro', 'Positivo')
+
+# Lazy singletons: loading RoBERTa costs hundreds of MB and ~1s, so it is
+# deferred to the first inference call; importing the module (e.g. just for
+# preprocess) stays cheap
+_tokenizer = None
+_model = None
+
+
+def _ensure_loaded() -> None:
+    """Load tokenizer and model on first use."""
+    global _tokenizer, _model
+
+    if _model is not None:
+        return
+
+    # Load from local folder; use_fast guards against silently falling back
+    # to the pure-Python tokenizer
+    _tokenizer = AutoTokenizer.from_pretrained(model_path, use_fast=True)
+
+    model = None
+
+    # Opt-in: ONNX Runtime backend for CPU serving (graph-level folding and
+    # oneDNN-tuned kernels); falls back to PyTorch eager if optimum is missing
+    if os.getenv("SENTIMENT_ONNX") == "1":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            model = ORTModelForSequenceClassification.from_pretrained(
+                model_path, export=True, provider="CPUExecutionProvider"
+            )
+        except ImportError:
+            pass
+
+    if model is None and os.getenv("SENTIMENT_QUANTIZE") == "1":
+        # Opt-in: dynamic per-channel int8 quantization of the Linear layers
+        # (VNNI int8 GEMM on modern x86, no calibration data needed). Starts
+        # from fp32 weights, which quantize_dynamic requires.
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_path, attn_implementation="sdpa"
+        )
+        model.eval()
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    if model is None:
+        # PyTorch eager path; loading straight into bf16 halves both the weight
+        # RAM footprint and the inference memory bandwidth. SDPA fuses the
+        # attention block (QK^T, softmax, V) into one kernel.
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_path, torch_dtype=torch.bfloat16, attn_implementation="sdpa"
+        )
+        model.eval()
+
+        # Opt-in: TorchInductor graph compilation. Guarded by an env var because
+        # the first-call compile cost is unwanted for tests and one-off scripts;
+        # dynamic=True keeps varying sequence lengths from recompiling.
+        if os.getenv("TORCH_COMPILE") == "1":
+            model = torch.compile(model, mode="reduce-overhead", dynamic=True)
+
+    _model = model
+
+
+# Fixed sequence-length buckets: padding every batch up to one of these
+# lengths keeps the set of tensor shapes finite, which is what lets
+# torch.compile(mode="reduce-overhead") cache graphs (and capture CUDA
+# Graphs on GPU) instead of re-specializing per input length. Only worth
+# it when compiling — plain eager would just pay for the extra tokens.
+_SEQ_BUCKETS: tuple[int, ...] = (64, 128, 256, 512)
+_PAD_TO_BUCKET: bool = os.getenv("TORCH_COMPILE") == "1"
+
+
+# Mentions and URLs at token start, rewritten in a single C-level pass;
+# the lookbehind keeps mid-word matches like "a@b" untouched, matching
+# the original split-on-space semantics
+_MENTION_URL_RE = re.compile(r'(?<!\S)(@\w+|https?\S*)')
 
 
 def preprocess(text: str) -> str:
     """Preprocess text (username and link placeholders for @/URLs)
-    
+
     Args:
         text: Input text to preprocess
-        
+
     Returns:
         Preprocessed text with placeholders
     """
-    new_text: list[str] = []
-    for t in text.split(" "):
-        t = '@user' if t.startswith('@') and len(t) > 1 else t
-        t = 'http' if t.startswith('http') else t
-        new_text.append(t)
-    return " ".join(new_text)
+    # Fast path: nothing to rewrite
+    if '@' not in text and 'http' not in text:
+        return text
+    return _MENTION_URL_RE.sub(
+        lambda m: '@user' if m.group(1)[0] == '@' else 'http', text
+    )
+
+def analyze_sentiment_batch(texts: list[str]) -> list[Dict[str, float]]:
+    """Classify sentiment for a batch of texts in a single forward pass
+
+    Args:
+        texts: List of input texts to analyze
+
+    Returns:
+        List of dictionaries with sentiment scores for each class
+    """
+    _ensure_loaded()
+    preprocessed: list[str] = [preprocess(text) for text in texts]
+    # Padding is only needed to align multiple sequences; skip it (and the
+    # attention-mask fill) for the single-text case
+    encoded_input = _tokenizer(
+        preprocessed, return_tensors='pt', truncation=True,
+        padding=len(preprocessed) > 1, max_length=512
+    )
+    if _PAD_TO_BUCKET:
+        _pad_to_bucket(encoded_input)
+    with torch.inference_mode():
+        logits = _model(**encoded_input).logits
+    # Softmax in fp32 to avoid underflow on reduced-precision logits;
+    # .tolist() is the only device-to-host copy, no numpy round-trip
+    scores = torch.softmax(logits.float(), dim=-1).tolist()
+    return [dict(zip(LABELS, row)) for row in scores]
+
+def _pad_to_bucket(encoded_input) -> None:
+    """Pad input_ids/attention_mask in place up to the next bucket length."""
+    length: int = encoded_input['input_ids'].shape[1]
+    bucket: int = next(b for b in _SEQ_BUCKETS if b >= length)
+    padding: int = bucket - length
+    if padding:
+        pad_id: int = _tokenizer.pad_token_id or 0
+        encoded_input['input_ids'] = torch.nn.functional.pad(
+            encoded_input['input_ids'], (0, padding), value=pad_id
+        )
+        encoded_input['attention_mask'] = torch.nn.functional.pad(
+            encoded_input['attention_mask'], (0, padding), value=0
+        )
+
+@functools.lru_cache(maxsize=4096)
+def _infer(preprocessed_text: str) -> Tuple[float, ...]:
+    """Run one forward pass on an already-preprocessed text, with an LRU
+    cache keyed on the string: repeated inputs (duplicate tweets, retries)
+    skip the tokenizer and the model entirely.
+
+    Args:
+        preprocessed_text: Text already passed through preprocess()
+
+    Returns:
+        Tuple of softmax scores in LABELS order
+    """
+    _ensure_loaded()
+    encoded_input = _tokenizer(
+        preprocessed_text, return_tensors='pt', truncation=True, max_length=512
+    )
+    if _PAD_TO_BUCKET:
+        _pad_to_bucket(encoded_input)
+    with torch.inference_mode():
+        logits = _model(**encoded_input).logits
+    return tuple(torch.softmax(logits[0].float(), dim=-1).tolist())
 
 def analyze_sentiment(text: str) -> Dict[str, float]:
     """Classify sentiment in positive, neutral, negative
-    
+
     Args:
         text: Input text to analyze
-        
+
     Returns:
         Dictionary with sentiment scores for each class
     """
-    text = preprocess(text)
-    encoded_input = tokenizer(text, return_tensors='pt', truncation=True, padding=True, max_length=512)
-    output = model(**encoded_input)
-    scores = softmax(output.logits.detach().numpy()[0])
-    
-    labels: list[str] = ['Negativo', 'Neutro', 'Positivo']
-    result: Dict[str, float] = {label: float(score) for label, score in zip(labels, scores)}
-    return result   
\ No newline at end of file
+    return dict(zip(LABELS, _infer(preprocess(text))))
\ No newline at end of file
@@ -4,9 +4,10 @@ from pathlib import Path
 import tempfile
 import json
 from src.sentiment_model import analyze_sentiment, preprocess
-from src.monitoring import PredictionLogger
+from src.monitoring import PredictionLogger, JsonlTailReader
 from src.metrics import MetricsTracker
 from src.drift_detection import DriftDetector
+from src.log_store import LogStore, BinaryLogSink
 
 
 class TestPreprocess:
@@ -189,6 +190,19 @@ class TestMetricsTracker:
         assert metrics.sentiment_distribution["Neutro"] == 1
         assert pytest.approx(metrics.average_confidence, 0.01) == 0.733
     
+    def test_incremental_snapshot(self, temp_metrics_dir: str, sample_logs) -> None:
+        """Test delle metriche incrementali via update/snapshot."""
+        tracker = MetricsTracker(metrics_dir=temp_metrics_dir)
+        for log in sample_logs:
+            tracker.update(log)
+
+        snapshot = tracker.snapshot()
+        full = tracker.calculate_metrics(sample_logs)
+
+        assert snapshot.total_predictions == full.total_predictions
+        assert snapshot.sentiment_distribution == full.sentiment_distribution
+        assert pytest.approx(snapshot.average_confidence) == full.average_confidence
+
     def test_save_and_load_metrics(self, temp_metrics_dir: str, sample_logs) -> None:
         """Test del salvataggio e caricamento delle metriche."""
         tracker = MetricsTracker(metrics_dir=temp_metrics_dir)
@@ -267,4 +281,173 @@ class TestDriftDetector:
         
         assert report.drift_detected == False  # Stesso dataset
         assert report.drift_score >= 0.0
-        assert report.drift_score <= 1.0
\ No newline at end of file
+        assert report.drift_score <= 1.0
+
+class TestLogStore:
+    """Test dello store colonnare delle predizioni."""
+
+    @pytest.fixture
+    def temp_store_dir(self):
+        """Crea una directory temporanea per lo store."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+
+    @pytest.fixture
+    def sample_logs(self):
+        """Crea log di esempio."""
+        from src.monitoring import PredictionLog
+        from datetime import datetime
+
+        return [
+            PredictionLog(
+                timestamp=datetime.now().isoformat(),
+                text=f"Text {i}",
+                sentiment="Positivo" if i % 2 == 0 else "Negativo",
+                confidence=0.8,
+                scores={}
+            )
+            for i in range(4)
+        ]
+
+    def test_append_load_count(self, temp_store_dir: str, sample_logs) -> None:
+        """Test del round-trip append/load/count."""
+        store = LogStore(store_dir=temp_store_dir)
+        assert store.count() == 0
+
+        for log in sample_logs:
+            store.append(log)
+
+        assert store.count() == 4
+        confidences, sentiments, timestamps = store.load()
+        assert len(confidences) == len(sentiments) == len(timestamps) == 4
+        assert list(sentiments) == [2, 0, 2, 0]
+        assert confidences[0] == pytest.approx(0.8)
+
+    def test_unknown_sentiment(self, temp_store_dir: str) -> None:
+        """Test che un'etichetta sconosciuta non rompe il calcolo SoA."""
+        from src.monitoring import PredictionLog
+        from datetime import datetime
+
+        store = LogStore(store_dir=temp_store_dir)
+        store.append(PredictionLog(
+            timestamp=datetime.now().isoformat(),
+            text="ok", sentiment="Positivo", confidence=0.9, scores={}
+        ))
+        store.append(PredictionLog(
+            timestamp=datetime.now().isoformat(),
+            text="boh", sentiment="Sconosciuto", confidence=0.5, scores={}
+        ))
+
+        confidences, sentiments, _ = store.load()
+        tracker = MetricsTracker(metrics_dir=temp_store_dir)
+        metrics = tracker.calculate_metrics_soa(confidences, sentiments)
+
+        assert metrics.total_predictions == 2
+        assert metrics.sentiment_distribution == {"Positivo": 1}
+
+    def test_clear(self, temp_store_dir: str, sample_logs) -> None:
+        """Test della cancellazione dello store."""
+        store = LogStore(store_dir=temp_store_dir)
+        for log in sample_logs:
+            store.append(log)
+        assert store.count() == 4
+
+        store.clear()
+        assert store.count() == 0
+        confidences, sentiments, timestamps = store.load()
+        assert len(confidences) == 0
+
+
+class TestBinaryLogSink:
+    """Test del sink binario bufferizzato."""
+
+    @pytest.fixture
+    def temp_sink_dir(self):
+        """Crea una directory temporanea per il sink."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+
+    @pytest.fixture
+    def sample_logs(self):
+        """Crea log di esempio."""
+        from src.monitoring import PredictionLog
+        from datetime import datetime
+
+        return [
+            PredictionLog(
+                timestamp=datetime.now().isoformat(),
+                text=f"Text {i}",
+                sentiment="Neutro",
+                confidence=0.6,
+                scores={}
+            )
+            for i in range(5)
+        ]
+
+    def test_batched_flush(self, temp_sink_dir: str, sample_logs) -> None:
+        """Test del flush a blocchi di batch_size record."""
+        sink = BinaryLogSink(store_dir=temp_sink_dir, batch_size=2)
+
+        for log in sample_logs:
+            sink.append(log)
+
+        # 5 record con batch_size=2: due batch su disco, uno in buffer
+        assert sink.count() == 4
+        sink.flush()
+        assert sink.count() == 5
+
+        records = sink.load()
+        assert len(records) == 5
+        assert list(records['sent']) == [1] * 5
+        assert records['conf'][0] == pytest.approx(0.6)
+
+    def test_clear(self, temp_sink_dir: str, sample_logs) -> None:
+        """Test della cancellazione del sink."""
+        sink = BinaryLogSink(store_dir=temp_sink_dir, batch_size=2)
+        for log in sample_logs:
+            sink.append(log)
+        sink.flush()
+        assert sink.count() == 5
+
+        sink.clear()
+        assert sink.count() == 0
+        assert len(sink.load()) == 0
+
+
+class TestJsonlTailReader:
+    """Test del lettore incrementale di file JSONL."""
+
+    @pytest.fixture
+    def temp_jsonl(self):
+        """Crea una directory temporanea con un path JSONL."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir) / "history.jsonl"
+
+    @staticmethod
+    def _append(path: Path, record: dict) -> None:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def test_incremental_read(self, temp_jsonl: Path) -> None:
+        """Test che le righe aggiunte dopo una lettura vengono raccolte."""
+        reader = JsonlTailReader(temp_jsonl)
+        assert reader.read() == []
+
+        self._append(temp_jsonl, {"n": 1})
+        assert reader.read() == [{"n": 1}]
+
+        self._append(temp_jsonl, {"n": 2})
+        assert reader.read() == [{"n": 1}, {"n": 2}]
+
+    def test_truncation_reset(self, temp_jsonl: Path) -> None:
+        """Test che un file troncato o cancellato azzera il lettore."""
+        reader = JsonlTailReader(temp_jsonl)
+        self._append(temp_jsonl, {"n": 1})
+        self._append(temp_jsonl, {"n": 2})
+        assert len(reader.read()) == 2
+
+        temp_jsonl.unlink()
+        assert reader.read() == []
+
+        self._append(temp_jsonl, {"n": 3})
+        assert reader.read() == [{"n": 3}]